@@ -1,13 +1,23 @@
 import os
-import json
-import base64
-import subprocess
+import asyncio
+import binascii
 import shutil
+import stat
+import functools
+import mmap
+import time
+import threading
+import uuid
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from flask import Flask, render_template, request, jsonify
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from flask import Flask, Response, render_template, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from jsonschema import Draft7Validator, ValidationError
+import orjson
 
 # ---- Paths ----
 APP_ROOT = Path(__file__).parent.resolve()
@@ -50,10 +60,31 @@ JSON_SCHEMA_V1 = {
     },
     "additionalProperties": False
 }
+Draft7Validator.check_schema(JSON_SCHEMA_V1)
+SPEC_VALIDATOR = Draft7Validator(JSON_SCHEMA_V1)
 
 APPLY_CHANGES = os.environ.get("APPLY_CHANGES", "1") not in ("0", "false", "False")
+BUILD_WORKERS = int(os.environ.get("BUILD_WORKERS", "2"))
+JOB_TTL = int(os.environ.get("JOB_TTL", "600"))
+
+class OrjsonProvider(DefaultJSONProvider):
+    """request.get_json / jsonify through orjson instead of stdlib json."""
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__, static_folder=str(STATIC_DIR), template_folder=str(TEMPLATES_DIR))
+app.json = OrjsonProvider(app)
+_wsgi_asgi = WsgiToAsgi(app)
+
+async def asgi(scope, receive, send):
+    """ASGI entry point: uvicorn app:asgi"""
+    # WsgiToAsgi runs the WSGI app as a thread-sensitive call; without a
+    # per-request context every request would share asgiref's single thread.
+    async with ThreadSensitiveContext():
+        await _wsgi_asgi(scope, receive, send)
 
 # ----------------- Gradle root discovery -----------------
 GRADLE_FILES = ("build.gradle", "build.gradle.kts")
@@ -70,8 +101,31 @@ def _clean_path(s: str) -> Path:
     except Exception:
         return p
 
+GRADLEW = "gradlew.bat" if os.name == "nt" else "gradlew"
+_PROBE_NAMES = frozenset(GRADLE_FILES + SETTINGS_FILES + (GRADLEW,))
+
+@functools.lru_cache(maxsize=256)
+def _probe(dir_str: str, mtime_ns: int) -> frozenset[str]:
+    # One directory listing instead of a stat per candidate name. is_file() follows
+    # symlinks (so a dangling gradlew link does not count) and usually comes free
+    # from the d_type scandir already has.
+    try:
+        with os.scandir(dir_str) as it:
+            return frozenset(e.name for e in it if e.name in _PROBE_NAMES and e.is_file())
+    except OSError:
+        return frozenset()
+
+def _gradle_names(p: Path) -> frozenset[str]:
+    """Which of the build/settings/wrapper files exist in p. Cached on the directory's
+    mtime, which changes whenever an entry is added or removed."""
+    try:
+        mtime_ns = os.stat(p).st_mtime_ns
+    except OSError:
+        return frozenset()
+    return _probe(str(p), mtime_ns)
+
 def _has_any(p: Path, names: tuple[str, ...]) -> bool:
-    return any((p / n).exists() for n in names)
+    return not _gradle_names(p).isdisjoint(names)
 
 def find_gradle_root(user_input: str) -> tuple[Path | None, str]:
     """
@@ -83,10 +137,12 @@ def find_gradle_root(user_input: str) -> tuple[Path | None, str]:
       4) Shallow scan children (depth <= 2) for multi-module roots.
     """
     p = _clean_path(user_input)
-    if not p.exists():
+    try:
+        st = p.stat()
+    except OSError:
         return None, f"path does not exist: {p}"
 
-    if p.is_file():
+    if stat.S_ISREG(st.st_mode):
         p = p.parent
 
     # 2) Direct hit
@@ -120,100 +176,317 @@ def find_gradle_root(user_input: str) -> tuple[Path | None, str]:
 # ----------------- Utilities -----------------
 def detect_repo_url(root: Path) -> str | None:
     cfg = root / ".git" / "config"
-    if not cfg.exists():
+    try:
+        mtime_ns = cfg.stat().st_mtime_ns
+    except OSError:
         return None
+    return _origin_url(str(cfg), mtime_ns)
+
+@functools.lru_cache(maxsize=128)
+def _origin_url(cfg_str: str, mtime_ns: int) -> str | None:
+    """`url` of [remote "origin"], scanned in place over an mmap of the config.
+    Cached per config mtime, so repeat calls cost one stat until the config changes."""
     try:
-        txt = cfg.read_text(errors="replace")
-        for line in txt.splitlines():
-            line = line.strip()
-            if line.startswith("url ="):
-                return line.split("=", 1)[1].strip()
-    except Exception:
+        with open(cfg_str, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = mm.find(b'[remote "origin"]')
+            if start < 0:
+                return None
+            end = mm.find(b"\n[", start)
+            if end < 0:
+                end = len(mm)
+            i = start
+            while (i := mm.find(b"url", i, end)) >= 0:
+                line_start = mm.rfind(b"\n", 0, i) + 1
+                nl = mm.find(b"\n", i, end)
+                if nl < 0:
+                    nl = end
+                key, sep, value = mm[line_start:nl].partition(b"=")
+                if sep and key.strip() == b"url":
+                    return value.strip().decode("utf-8", errors="replace") or None
+                i = nl
+    except (OSError, ValueError):
+        # ValueError: mmap of an empty file.
         return None
     return None
 
-def run_gradle(root: Path) -> tuple[int, str]:
-    gradlew = "gradlew.bat" if os.name == "nt" else "gradlew"
-    cmd = [str(root / gradlew), "clean", "build"] if (root / gradlew).exists() else ["gradle", "clean", "build"]
+async def run_gradle(root: Path, log_path: Path) -> int:
+    """Run the build with stdout/stderr going straight into log_path; returns the exit code."""
+    cmd = [str(root / GRADLEW), "clean", "build"] if GRADLEW in _gradle_names(root) else ["gradle", "clean", "build"]
+    with open(log_path, "wb") as log_fh:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, cwd=root, stdout=log_fh, stderr=asyncio.subprocess.STDOUT
+            )
+            return await proc.wait()
+        except FileNotFoundError:
+            log_fh.write(b"Gradle not found. Ensure gradle is on PATH or include a gradle wrapper.\n")
+            return 127
+        except Exception as e:
+            log_fh.write(f"Unexpected error: {e}\n".encode("utf-8", errors="replace"))
+            return 1
+
+async def run_command(cmd: str, cwd: Path) -> dict:
     try:
-        proc = subprocess.run(cmd, cwd=root, capture_output=True, text=True)
-        return proc.returncode, proc.stdout + "\n\n" + proc.stderr
-    except FileNotFoundError:
-        return 127, "Gradle not found. Ensure gradle is on PATH or include a gradle wrapper.\n"
+        # One merged pipe, drained in large blocks by communicate().
+        proc = await asyncio.create_subprocess_shell(
+            cmd, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+        stdout, _ = await proc.communicate()
+        return {"cmd": cmd, "returncode": proc.returncode, "output": stdout.decode("utf-8", errors="replace")}
     except Exception as e:
-        return 1, f"Unexpected error: {e}\n"
+        return {"cmd": cmd, "returncode": 1, "output": f"Error: {e}"}
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+def _write_all(fd: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def _content_bytes(change: dict) -> bytes:
+    content = change["content"]
+    return binascii.a2b_base64(content) if change.get("encoding", "utf-8") == "base64" else content.encode("utf-8")
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """Write a sibling .tmp file and os.replace() it over path, so readers never see a
+    partial file. No fsync: prompts and logs are recoverable artifacts."""
+    tmp = f"{path}.tmp"
+    fd = os.open(tmp, _WRITE_FLAGS, 0o666)
+    try:
+        _write_all(fd, data)
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp)
+        raise
+    os.close(fd)
+    os.replace(tmp, path)
 
-def write_file(target: Path, content: str, encoding: str = "utf-8"):
-    target.parent.mkdir(parents=True, exist_ok=True)
-    if encoding == "base64":
-        target.write_bytes(base64.b64decode(content))
+def _flush_writes(pending: dict[Path, dict]):
+    """Write a run of write/create changes. Decoding, mkdir (once per parent) and open
+    happen in spec order, so a failure stops the run where the baseline loop would have;
+    only the byte writes to the files opened so far run in parallel."""
+    if not pending:
+        return
+    made_dirs: set[Path] = set()
+    opened: list[tuple[int, bytes]] = []
+    try:
+        for target, change in pending.items():
+            data = _content_bytes(change)
+            if target.parent not in made_dirs:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                made_dirs.add(target.parent)
+            opened.append((os.open(target, _WRITE_FLAGS, 0o666), data))
+    finally:
+        # Every file opened so far precedes any failure in spec order: write it either way.
+        try:
+            if len(opened) > 1:
+                with ThreadPoolExecutor(max_workers=min(32, len(opened))) as pool:
+                    for fut in [pool.submit(_write_all, fd, data) for fd, data in opened]:
+                        fut.result()
+            elif opened:
+                _write_all(*opened[0])
+        finally:
+            for fd, _ in opened:
+                os.close(fd)
+            pending.clear()
+
+def _project_path(root_prefix: str, rel: str, follow_last: bool = True) -> Path | None:
+    """Join rel onto the resolved root; None unless its real location is strictly inside it.
+    Symlinks are resolved because writes and moves follow them. With follow_last=False only
+    the parent is resolved, for operations that act on the final entry itself."""
+    target = os.path.normpath(os.path.join(root_prefix, rel))
+    if not target.startswith(root_prefix):
+        return None
+    if follow_last:
+        real = os.path.realpath(target)
     else:
-        target.write_text(content, encoding="utf-8", newline="\n")
+        parent, name = os.path.split(target)
+        real = os.path.join(os.path.realpath(parent), name)
+    return Path(real) if real.startswith(root_prefix) else None
 
 def apply_patch_spec(root: Path, spec: dict) -> list[str]:
     actions_log = []
-    validator = Draft7Validator(JSON_SCHEMA_V1)
-    errors = sorted(validator.iter_errors(spec), key=lambda e: e.path)
+    errors = sorted(SPEC_VALIDATOR.iter_errors(spec), key=lambda e: e.path)
     if errors:
         raise ValidationError("\n".join([f"{'/'.join(map(str, e.path))}: {e.message}" for e in errors]))
+    # Consecutive write/create changes are batched; any other action (or a
+    # repeated target) flushes the batch first so spec order is preserved.
+    pending: dict[Path, dict] = {}
+    root_prefix = os.path.join(str(root.resolve()), "")
     for change in spec["changes"]:
         action = change["action"]
         path = change["path"]
-        target = (root / path).resolve()
-        if not str(target).startswith(str(root.resolve())):
+        target = _project_path(root_prefix, path, follow_last=action != "delete")
+        if target is None:
             raise ValueError(f"Unsafe path outside project: {path}")
         if action in ("write", "create"):
-            write_file(target, change["content"], change.get("encoding", "utf-8"))
+            if target in pending:
+                _flush_writes(pending)
+            pending[target] = change
             actions_log.append(f"{action.upper()} {path}")
-        elif action == "delete":
-            if target.exists():
+            continue
+        _flush_writes(pending)
+        if action == "delete":
+            if target.is_symlink():
+                target.unlink()
+            elif target.exists():
                 shutil.rmtree(target) if target.is_dir() else target.unlink()
             actions_log.append(f"DELETE {path}")
         elif action == "move":
-            src = (root / change["from"]).resolve()
-            dst = (root / change["to"]).resolve()
-            if not str(src).startswith(str(root.resolve())) or not str(dst).startswith(str(root.resolve())):
+            src = _project_path(root_prefix, change["from"], follow_last=False)
+            dst = _project_path(root_prefix, change["to"])
+            if src is None or dst is None:
                 raise ValueError("Unsafe move path outside project")
             dst.parent.mkdir(parents=True, exist_ok=True)
             shutil.move(str(src), str(dst))
             actions_log.append(f"MOVE {change['from']} -> {change['to']}")
         else:
             raise ValueError(f"Unknown action: {action}")
+    _flush_writes(pending)
     return actions_log
 
+# Fixed prompt text around the per-build fields, built once at import.
+_PROMPT_HEADER = (
+    "You are a code fix generator for a local Gradle Java project. "
+    "Output ONLY a single JSON object that matches this schema exactly: "
+    "{version:string,intent:\"apply_fixes\",changes:[{action:\"write|create|delete|move\",path:string,encoding?:\"utf-8|base64\",content?:string,from?:string,to?:string}],commands?:string[],notes?:string}. "
+    "Never include Markdown, code fences, or explanations. All modified or new files MUST be full-file contents. "
+    "If no changes are needed, output {\"version\":\"1\",\"intent\":\"apply_fixes\",\"changes\":[]}."
+    "\n\nGradle root: "
+)
+_PROMPT_REPO = "\nRepository URL: "
+_PROMPT_OUTPUT_BEGIN = (
+    "\nConstraints: Java 21 if present, minimal invasive changes, keep API surface stable."
+    "\n\n==== LAST BUILD OUTPUT BEGIN ====\n"
+)
+_PROMPT_OUTPUT_END = "\n==== LAST BUILD OUTPUT END ===="
+
+PROMPT_OUTPUT_CAP = 300_000  # bytes of build log embedded in the prompt
+_TRUNCATED_MARK = "...[truncated head]...\n"
+
+def read_log_tail(log_path: Path, cap: int = PROMPT_OUTPUT_CAP) -> str:
+    """At most `cap` bytes from the end of the log, truncation mark included, starting
+    at a line boundary. Failing builds put the interesting part at the end, so only
+    the tail is read from disk. This is the only place the prompt output is capped."""
+    with open(log_path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size <= cap:
+            f.seek(0)
+            return f.read().decode("utf-8", errors="replace")
+        f.seek(size - (cap - len(_TRUNCATED_MARK)))
+        data = f.read()
+    nl = data.find(b"\n")
+    return _TRUNCATED_MARK + data[nl + 1:].decode("utf-8", errors="replace")
+
 def build_prompt(root: Path, build_output: str, repo_url: str | None) -> str:
-    header = (
-        "You are a code fix generator for a local Gradle Java project. "
-        "Output ONLY a single JSON object that matches this schema exactly: "
-        "{version:string,intent:\"apply_fixes\",changes:[{action:\"write|create|delete|move\",path:string,encoding?:\"utf-8|base64\",content?:string,from?:string,to?:string}],commands?:string[],notes?:string}. "
-        "Never include Markdown, code fences, or explanations. All modified or new files MUST be full-file contents. "
-        "If no changes are needed, output {\"version\":\"1\",\"intent\":\"apply_fixes\",\"changes\":[]}."
-    )
-    return "\n".join([
-        header,
-        "",
-        f"Gradle root: {root}",
-        f"Repository URL: {repo_url or 'unknown'}",
-        "Constraints: Java 21 if present, minimal invasive changes, keep API surface stable.",
-        "",
-        "==== LAST BUILD OUTPUT BEGIN ====",
-        build_output.strip()[:300000],
-        "==== LAST BUILD OUTPUT END ====",
-    ])
+    """build_output is embedded as given; bound it first with read_log_tail."""
+    return "".join((
+        _PROMPT_HEADER, str(root),
+        _PROMPT_REPO, repo_url or "unknown",
+        _PROMPT_OUTPUT_BEGIN, build_output,
+        _PROMPT_OUTPUT_END,
+    ))
 
-def call_openai_json(prompt: str) -> dict:
+@functools.lru_cache(maxsize=1)
+def _openai_client():
+    """One client per process so its HTTP connection pool (keep-alive, TLS) is reused across prompts."""
     # Requires: pip install openai>=1.40
     from openai import OpenAI
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-    resp = client.responses.create(
+    return OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), timeout=120)
+
+def call_openai_json(prompt: str) -> dict:
+    resp = _openai_client().responses.create(
         model=os.environ.get("OPENAI_MODEL", "gpt-4o-mini"),
         input=[{"role": "system", "content": "You are a strict JSON patch generator."},
                {"role": "user", "content": prompt}],
         response_format={"type": "json_object"},
         temperature=0
     )
-    raw = getattr(resp, "output_text", None) or ""
-    return json.loads(raw)
+    raw = getattr(resp, "output_text", None)
+    if not raw:
+        # Report the status only; never stringify the whole response.
+        raise ValueError(f"OpenAI response has no output text (status: {getattr(resp, 'status', 'unknown')})")
+    return orjson.loads(raw)
+
+# ----------------- Build jobs -----------------
+_EXECUTOR = ThreadPoolExecutor(max_workers=BUILD_WORKERS, thread_name_prefix="gradle-build")
+# Request threads and the stream generators touch the registry concurrently.
+_STATE_LOCK = threading.Lock()
+_JOBS: dict[str, dict] = {}
+
+def _mark_finished(job: dict, _future):
+    job["finished_at"] = time.monotonic()
+
+def _evict_expired_locked():
+    """Drop jobs that finished more than JOB_TTL seconds ago; until then the result
+    stays available from the stream and from GET /api/run/<job_id>."""
+    now = time.monotonic()
+    for job_id in [j for j, job in _JOBS.items() if now - job.get("finished_at", now) > JOB_TTL]:
+        del _JOBS[job_id]
+
+def _add_job(job_id: str, job: dict):
+    job["future"].add_done_callback(functools.partial(_mark_finished, job))
+    with _STATE_LOCK:
+        _evict_expired_locked()
+        _JOBS[job_id] = job
+
+def _get_job(job_id: str) -> dict | None:
+    with _STATE_LOCK:
+        _evict_expired_locked()
+        return _JOBS.get(job_id)
+
+async def run_build_job(gradle_root: Path, log_path: Path, prompt_path: Path) -> dict:
+    """Build; on failure, prompt OpenAI and apply the returned spec. Returns the result payload."""
+    rc = await run_gradle(gradle_root, log_path)
+
+    if rc == 0:
+        return {"ok": True, "status": "success", "log_file": str(log_path), "gradle_root": str(gradle_root)}
+
+    # One stat plus an lru_cache hit on repeat builds; only failures need it.
+    repo_url = detect_repo_url(gradle_root)
+    out = read_log_tail(log_path)
+    prompt = build_prompt(gradle_root, out, repo_url)
+    atomic_write_bytes(prompt_path, prompt.encode("utf-8", errors="replace"))
+
+    try:
+        # The SDK call blocks on HTTP; keep it off the event loop.
+        spec = await asyncio.to_thread(call_openai_json, prompt)
+    except Exception as e:
+        return {
+            "ok": False,
+            "status": "openai_error",
+            "error": str(e),
+            "prompt_file": str(prompt_path),
+            "log_file": str(log_path),
+            "gradle_root": str(gradle_root)
+        }
+
+    try:
+        actions_log = apply_patch_spec(gradle_root, spec) if APPLY_CHANGES else []
+        cmd_outs = [await run_command(cmd, gradle_root) for cmd in spec.get("commands", [])]
+        return {
+            "ok": True,
+            "status": "patch_applied" if APPLY_CHANGES else "validated_only",
+            "actions": actions_log,
+            "spec": spec,
+            "prompt_file": str(prompt_path),
+            "log_file": str(log_path),
+            "gradle_root": str(gradle_root),
+            "commands": cmd_outs
+        }
+    except ValidationError as ve:
+        return {"ok": False, "status": "schema_error", "error": str(ve), "spec": spec}
+    except Exception as e:
+        return {"ok": False, "status": "apply_error", "error": str(e), "spec": spec}
+
+def _job_result(future) -> dict:
+    try:
+        return future.result()
+    except Exception as e:
+        return {"ok": False, "status": "job_error", "error": str(e)}
+
+def _sse(data: str, event: str | None = None) -> str:
+    return (f"event: {event}\n" if event else "") + f"data: {data}\n\n"
 
 # ----------------- Routes -----------------
 @app.route("/", methods=["GET"])
@@ -243,55 +516,71 @@ def api_run():
     if not gradle_root:
         return jsonify({"ok": False, "error": f"Gradle files not found. {reason}"}), 400
 
-    rc, out = run_gradle(gradle_root)
+    job_id = uuid.uuid4().hex
     ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-    log_path = LOGS_DIR / f"build-{ts}.log"
-    log_path.write_text(out, encoding="utf-8", newline="\n")
+    log_path = LOGS_DIR / f"build-{ts}-{job_id[:8]}.log"
+    prompt_path = PROMPTS_DIR / f"prompt-{ts}-{job_id[:8]}.txt"
+    future = _EXECUTOR.submit(asyncio.run, run_build_job(gradle_root, log_path, prompt_path))
+    _add_job(job_id, {"future": future, "log_path": log_path})
+    return jsonify({
+        "ok": True,
+        "job_id": job_id,
+        "stream": f"/api/run/{job_id}/stream",
+        "result": f"/api/run/{job_id}",
+        "log_file": str(log_path),
+        "gradle_root": str(gradle_root)
+    }), 202
 
-    if rc == 0:
-        return jsonify({"ok": True, "status": "success", "log_file": str(log_path), "gradle_root": str(gradle_root)})
+@app.route("/api/run/<job_id>", methods=["GET"])
+def api_run_result(job_id: str):
+    """Result payload of a finished job (200), or 202 while it is still running."""
+    job = _get_job(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": f"Unknown job: {job_id}"}), 404
+    future = job["future"]
+    if not future.done():
+        return jsonify({"ok": True, "status": "running", "job_id": job_id}), 202
+    return jsonify(_job_result(future))
 
-    repo_url = detect_repo_url(gradle_root)
-    prompt = build_prompt(gradle_root, out, repo_url)
-    prompt_path = PROMPTS_DIR / f"prompt-{ts}.txt"
-    prompt_path.write_text(prompt, encoding="utf-8", newline="\n")
+@app.route("/api/run/<job_id>/stream", methods=["GET"])
+def api_run_stream(job_id: str):
+    """Server-Sent Events: one `data:` event per build log line, then a final `result` event."""
+    job = _get_job(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": f"Unknown job: {job_id}"}), 404
 
-    try:
-        spec = call_openai_json(prompt)
-    except Exception as e:
-        return jsonify({
-            "ok": False,
-            "status": "openai_error",
-            "error": str(e),
-            "prompt_file": str(prompt_path),
-            "log_file": str(log_path),
-            "gradle_root": str(gradle_root)
-        }), 500
+    def stream():
+        future, log_path = job["future"], job["log_path"]
+        fh, pending = None, b""
+        try:
+            while True:
+                done = future.done()
+                if fh is None:
+                    try:
+                        fh = open(log_path, "rb")
+                    except FileNotFoundError:
+                        pass
+                if fh is not None:
+                    *lines, pending = (pending + fh.read()).split(b"\n")
+                    for line in lines:
+                        yield _sse(line.rstrip(b"\r").decode("utf-8", errors="replace"))
+                if done:
+                    break
+                time.sleep(0.5)
+            if pending:
+                yield _sse(pending.rstrip(b"\r").decode("utf-8", errors="replace"))
+            yield _sse(app.json.dumps(_job_result(future)), event="result")
+        finally:
+            # The job is not dropped here: under WsgiToAsgi a client disconnect is
+            # not signalled to the generator (sends are silently discarded), so it
+            # keeps polling until the build ends and we cannot tell whether the
+            # result event was delivered. The entry expires via JOB_TTL instead.
+            if fh is not None:
+                fh.close()
 
-    try:
-        actions_log = apply_patch_spec(gradle_root, spec) if APPLY_CHANGES else []
-        cmd_outs = []
-        for cmd in spec.get("commands", []):
-            try:
-                proc = subprocess.run(cmd, cwd=gradle_root, shell=True, capture_output=True, text=True)
-                cmd_outs.append({"cmd": cmd, "returncode": proc.returncode, "output": (proc.stdout + "\n" + proc.stderr)})
-            except Exception as e:
-                cmd_outs.append({"cmd": cmd, "returncode": 1, "output": f"Error: {e}"})
-        return jsonify({
-            "ok": True,
-            "status": "patch_applied" if APPLY_CHANGES else "validated_only",
-            "actions": actions_log,
-            "spec": spec,
-            "prompt_file": str(prompt_path),
-            "log_file": str(log_path),
-            "gradle_root": str(gradle_root),
-            "commands": cmd_outs
-        })
-    except ValidationError as ve:
-        return jsonify({"ok": False, "status": "schema_error", "error": str(ve), "spec": spec}), 400
-    except Exception as e:
-        return jsonify({"ok": False, "status": "apply_error", "error": str(e), "spec": spec}), 500
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 if __name__ == "__main__":
+    import uvicorn
     port = int(os.environ.get("PORT", "5000"))
-    app.run(host="127.0.0.1", port=port, debug=True)
+    uvicorn.run(asgi, host="127.0.0.1", port=port)